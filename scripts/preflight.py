@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """
-Preflight checks: Black format -> Ruff lint.
+Preflight checks: Ruff fix -> Black format -> (Ruff lint | Black check), the last two in parallel.
 Skips missing paths with a warning. Targets src/sora_imagegen_tool.
+The uv environment is resolved once; each tool then runs directly from it.
 """
+
+import argparse
+import shutil
 import subprocess
 import sys
+import sysconfig
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 RED = "\033[91m"
@@ -16,21 +22,77 @@ RESET = "\033[0m"
 REQUESTED_PATHS = ["src/sora_imagegen_tool", "tests"]
 
 
-def run(desc: str, cmd: list[str], cwd: Path) -> None:
+def run(desc: str, cmd: list[str], cwd: Path) -> int:
+    """Run one check and return its exit code, printing its output only on failure."""
     print(f"{BLUE}[PRE-FLIGHT]{RESET} {desc}...")
     try:
         subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=cwd)
         print(f"{GREEN}✔ {desc} OK{RESET}")
+        return 0
     except subprocess.CalledProcessError as e:
         print(f"{RED}✘ {desc} failed. Aborting.{RESET}")
         if e.stdout:
             print(e.stdout)
         if e.stderr:
             print(e.stderr)
-        sys.exit(e.returncode)
+        return e.returncode
+
+
+def resolve_env(root: Path) -> tuple[str, Path]:
+    """Return the project interpreter and its scripts dir, paying for a single `uv run`."""
+    probe = "import sys, sysconfig; print(sys.executable); print(sysconfig.get_path('scripts'))"
+    try:
+        result = subprocess.run(
+            ["uv", "run", "python", "-c", probe], check=True, capture_output=True, text=True, cwd=root
+        )
+    except (OSError, subprocess.CalledProcessError):
+        print(f"{YELLOW}⚠ Could not resolve the uv environment; using {sys.executable}{RESET}")
+        return sys.executable, Path(sysconfig.get_path("scripts"))
+    python, scripts = result.stdout.strip().splitlines()[-2:]
+    return python, Path(scripts)
+
+
+def tool_cmd(name: str, python: str, scripts: Path) -> list[str]:
+    """Prefer the tool's own entry point (ruff is a native binary); fall back to `python -m`."""
+    exe = shutil.which(name, path=str(scripts))
+    return [exe] if exe else [python, "-m", name]
+
+
+def tool_available(cmd: list[str]) -> bool:
+    """Whether ``cmd --version`` runs, i.e. the tool is installed where we expect it."""
+    try:
+        return subprocess.run([*cmd, "--version"], capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run Black and Ruff over the project.")
+    parser.add_argument(
+        "-p",
+        "--processes",
+        type=int,
+        default=2,
+        help="Checks to run at once after formatting (use 1 on low-core CI runners).",
+    )
+    parser.add_argument(
+        "--skip-missing-tools",
+        action="store_true",
+        help="Warn and pass instead of failing when Black or Ruff isn't installed.",
+    )
+    return parser.parse_args(argv)
+
 
+def run_parallel(checks: list[tuple[str, list[str]]], cwd: Path, processes: int) -> int:
+    """Run read-only checks concurrently and return the highest exit code."""
+    with ThreadPoolExecutor(max_workers=max(processes, 1)) as pool:
+        futures = [pool.submit(run, desc, cmd, cwd) for desc, cmd in checks]
+        codes = [f.result() for f in futures]
+    return max(codes, default=0)
 
-def main() -> None:
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     root = (Path(__file__).resolve().parent).parent
 
     existing_paths = []
@@ -45,13 +107,42 @@ def main() -> None:
         print(f"{RED}✘ No valid paths to check. Aborting preflight.{RESET}")
         sys.exit(1)
 
-    black_cmd = ["uv", "run", "black"]
+    python, scripts = resolve_env(root)
+    black_cmd = tool_cmd("black", python, scripts)
     if (root / "black_two_space.py").exists():
-        black_cmd = ["uv", "run", "python", "black_two_space.py"]
+        black_cmd = [python, "black_two_space.py"]
+    ruff_cmd = tool_cmd("ruff", python, scripts)
+
+    missing = [name for name, cmd in (("ruff", ruff_cmd), ("black", black_cmd)) if not tool_available(cmd)]
+    if missing:
+        hint = f"{', '.join(missing)} not installed (run `uv sync --group dev`)"
+        if args.skip_missing_tools:
+            print(f"{YELLOW}⚠ {hint}. Skipping preflight checks.{RESET}")
+            return
+        print(f"{RED}✘ {hint}. Aborting preflight.{RESET}")
+        sys.exit(1)
+
+    # Everything that rewrites files runs first, one step at a time. Ruff goes first so
+    # Black re-formats whatever its fixes leave behind (e.g. a blank line for a removed import).
+    for desc, cmd in (
+        ("Ruff auto-fix", [*ruff_cmd, "check", "--fix", "--exit-zero", *existing_paths]),
+        ("Black auto-format", [*black_cmd, *existing_paths]),
+    ):
+        code = run(desc, cmd, root)
+        if code:
+            sys.exit(code)
 
-    run("Black dry-run (diff)", [*black_cmd, "--diff", "--color", *existing_paths], root)
-    run("Black auto-format", [*black_cmd, *existing_paths], root)
-    run("Ruff lint", ["uv", "run", "ruff", "check", "--fix", *existing_paths], root)
+    # The remaining checks only read the tree, so they can run side by side.
+    code = run_parallel(
+        [
+            ("Ruff lint", [*ruff_cmd, "check", *existing_paths]),
+            ("Black check (diff)", [*black_cmd, "--check", "--diff", "--color", *existing_paths]),
+        ],
+        root,
+        args.processes,
+    )
+    if code:
+        sys.exit(code)
 
     print(f"\n{GREEN}✅ All preflight checks passed!{RESET}")
 
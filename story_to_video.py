@@ -2,62 +2,155 @@
 """
 story_to_video.py
 Generate a sequence of images from a story and compile them into a video using OpenAI’s GPT-Image-1 model.
-Adds: progress bars (tqdm), parallel generation (threads), interactive API key prompt if missing,
+Adds: progress bars (tqdm), concurrent generation (asyncio), interactive API key prompt if missing,
 preflight checks (Black and Ruff), fail-fast error guards, and optional one-shot smoke test.
 """
 
 import argparse
+import asyncio
 import base64
+import contextlib
+import enum
+import hashlib
+import importlib.util
 import json
 import logging
-import multiprocessing
+import logging.handlers
+import mmap
 import os
+import pickle
+import shutil
 import subprocess
 import sys
+import tempfile
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from moviepy.audio.io.AudioFileClip import AudioFileClip
-from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
-from openai import OpenAI
-from tqdm import tqdm  # progress bars
+# openai and tqdm are imported where they're used so --help and test imports stay fast.
 
-# OpenAI client (initialized after we have a key)
-client = None
+try:  # optional: stream large prompt files instead of loading them whole
+    import ijson
+except ImportError:
+    ijson = None
 
+IMAGE_MODEL = "gpt-image-1"
+MAX_IMAGES_PER_REQUEST = 10  # API limit for ``n`` in one images.generate call
+DIRECT_IO_MIN_BYTES = 1 << 20  # frames this large are written with O_DIRECT where available
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "sora_imagegen"
 
-# --------- Error classifiers ---------
-def _safe_str(exc: Exception) -> str:
-    try:
-        return str(exc).lower()
-    except Exception:
-        return ""
+# OpenAI client, opened by generate_frames for the lifetime of its event loop
+client = None
+# Set once ensure_api_key / run_preflight have succeeded, so repeat calls in a long-lived process are free
+_api_key: str | None = None
+_preflight_done = False
 
+# Dedicated pool for base64 decoding and disk writes, so a finished request frees its
+# network slot immediately instead of holding it through decode + write.
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="frame-io")
 
-def _is_hard_limit_error(exc: Exception) -> bool:
-    s = _safe_str(exc)
-    return ("billing hard limit" in s) or ("billing_hard_limit_reached" in s)
+
+# --------- Error classifiers ---------
+class ErrorKind(enum.Enum):
+    HARD_LIMIT = enum.auto()
+    AUTH = enum.auto()
+    FORBIDDEN = enum.auto()
+    BAD_REQUEST = enum.auto()
+    RATE_LIMIT = enum.auto()
+    FATAL = enum.auto()
+    TRANSIENT = enum.auto()
+
+
+# Error codes that no amount of retrying will fix (both surface as 400/429 responses).
+_HARD_LIMIT_CODES = {"billing_hard_limit_reached", "insufficient_quota"}
+
+
+def _classify(exc: Exception) -> ErrorKind:
+    """Map an exception from the OpenAI SDK onto how the caller should react to it."""
+    import openai
+
+    if not isinstance(exc, openai.APIError):
+        # A bug on our side, not something the API will answer differently next time.
+        return ErrorKind.FATAL
+    if getattr(exc, "code", None) in _HARD_LIMIT_CODES:
+        return ErrorKind.HARD_LIMIT
+    if isinstance(exc, openai.AuthenticationError):
+        return ErrorKind.AUTH
+    if isinstance(exc, openai.PermissionDeniedError):
+        # e.g., “Your organization must be verified to use the model `gpt-image-1`.”
+        return ErrorKind.FORBIDDEN
+    if isinstance(exc, openai.BadRequestError):
+        # e.g., bad size param, empty prompt, etc.
+        return ErrorKind.BAD_REQUEST
+    if isinstance(exc, openai.RateLimitError):
+        return ErrorKind.RATE_LIMIT
+    if isinstance(exc, openai.APIStatusError) and 400 <= exc.status_code < 500:
+        # Any other 4xx (404, 409, 422, ...) fails the same way on every retry.
+        return ErrorKind.FATAL
+    # 5xx, timeouts, connection resets, ...
+    return ErrorKind.TRANSIENT
 
 
-def _is_auth_error(exc: Exception) -> bool:
-    s = _safe_str(exc)
-    return ("invalid api key" in s) or ("unauthorized" in s) or ("401" in s)
+# -------------------------------------
 
 
-def _is_forbidden_needs_verification(exc: Exception) -> bool:
-    s = _safe_str(exc)
-    # e.g., “Your organization must be verified to use the model `gpt-image-1`.”
-    return ("403" in s and "must be verified" in s) or ("access denied" in s)
+# ---------- Client-side rate limiting ----------
+class TokenBucket:
+    """Async token bucket that paces requests to the account's images-per-minute quota.
+
+    On a 429 the rate is halved for the next minute (AIMD), so the run settles at the
+    provider ceiling instead of oscillating between bursts and exponential backoff.
+    """
+
+    def __init__(self, rate_per_min: float) -> None:
+        if rate_per_min <= 0:
+            raise ValueError("rate_per_min must be positive")
+        self.rate_per_min = float(rate_per_min)
+        self._rate = self.rate_per_min
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._penalty_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self._penalty_until and now >= self._penalty_until:
+                    self._rate = self.rate_per_min
+                    self._penalty_until = 0.0
+                self._tokens = min(1.0, self._tokens + (now - self._last) * self._rate / 60.0)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) * 60.0 / self._rate)
+
+    def penalize(self) -> None:
+        """Halve the rate for the next minute after a 429 response.
+
+        Further 429s inside that minute (usually the rest of the same burst) don't halve it again.
+        """
+        now = time.monotonic()
+        if now < self._penalty_until:
+            return
+        self._rate = max(self._rate / 2, 1.0)
+        self._penalty_until = now + 60.0
+        logging.debug(f"Rate limited; throttling to {self._rate:.1f} requests/min for 60s")
 
 
-def _is_bad_request(exc: Exception) -> bool:
-    # e.g., bad size param, empty prompt, etc. (exclude rate limit wording)
-    s = _safe_str(exc)
-    return (("bad request" in s) or ("400" in s)) and ("rate limit" not in s)
+# -----------------------------------------------
 
 
-# -------------------------------------
+def _default_threads() -> int:
+    """CPUs this process may actually run on (honours taskset/cgroup limits), capped at 32."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on Windows/macOS
+        available = os.cpu_count() or 1
+    # Requests are I/O-bound against one endpoint; more than ~32 in flight buys nothing.
+    return min(available, 32)
 
 
 def parse_args() -> argparse.Namespace:
@@ -81,25 +174,53 @@ def parse_args() -> argparse.Namespace:
         default="frames",
         help="Directory to save generated images.",
     )
-    parser.add_argument(
+    frames_group = parser.add_mutually_exclusive_group()
+    frames_group.add_argument(
         "--skip-existing",
         action="store_true",
         help="Skip image generation if frame already exists.",
     )
+    frames_group.add_argument(
+        "--no-frames-dir",
+        action="store_true",
+        help="Keep frames in memory only and stream them to ffmpeg without writing PNGs.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=str(DEFAULT_CACHE_DIR),
+        help="Directory for the prompt→image cache reused across runs.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the API; neither read nor write the image cache.",
+    )
+    parser.add_argument(
+        "--cache-prompts",
+        action="store_true",
+        help="Reuse the parsed prompts file from --cache-dir until the file changes.",
+    )
     parser.add_argument("--quiet", action="store_true", help="Suppress console INFO/DEBUG logs.")
     parser.add_argument("--kenburns", action="store_true", help="Placeholder for Ken Burns effect.")
     parser.add_argument("--audio", type=str, default=None, help="Optional audio file for video.")
     parser.add_argument(
         "--threads",
         type=int,
-        default=multiprocessing.cpu_count(),
-        help="Number of parallel image generations. Defaults to CPU core count.",
+        default=_default_threads(),
+        help="Number of concurrent image requests. Defaults to available CPU cores (max 32).",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=50,
+        help="Image requests per minute allowed by your OpenAI account (client-side rate limit).",
     )
     # NEW: preflight + smoke test flags
     parser.add_argument(
         "--no-preflight",
         action="store_true",
-        help="Skip running preflight.py (Black and Ruff) before generation.",
+        help="Skip scripts/preflight.py, which Ruff-fixes and Black-formats src/ and tests/ before generation.",
     )
     parser.add_argument(
         "--smoke-test",
@@ -122,37 +243,77 @@ def setup_logging(quiet: bool) -> None:
     log_dir = Path(__file__).resolve().parent / "story-to-video"
     log_dir.mkdir(parents=True, exist_ok=True)
     log_path = log_dir / "run.log"
-    file_handler = logging.FileHandler(log_path, mode="a", encoding="utf-8")
+    # Rotate at 10 MB, keeping three old logs, so repeated DEBUG runs can't grow run.log without bound.
+    file_handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=10_000_000, backupCount=3, encoding="utf-8")
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    # Explicit datefmt skips the millisecond suffix the default asctime formatting adds.
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    )
     root_logger.addHandler(file_handler)
 
 
-def load_prompts(prompts_path: str) -> list:
-    with open(prompts_path, encoding="utf-8") as f:
-        scenes = json.load(f)
-    if not isinstance(scenes, list):
-        raise ValueError("prompts.json must contain a list of scenes")
+def load_prompts(prompts_path: str, limit: int | None = None, cache_dir: Path | None = None) -> list:
+    """Load scenes that have an ``index`` no greater than ``limit`` (at most ``limit`` of them).
+
+    With ijson installed the file is streamed and parsing stops as soon as enough scenes
+    are collected, so memory and time scale with ``limit`` rather than the file size.
+    If ``cache_dir`` is given, the result is pickled there keyed by the file's path,
+    mtime and size, and reused until the file changes.
+    """
+    if cache_dir is None:
+        return _parse_prompts(prompts_path, limit)
+
+    st = os.stat(prompts_path)
+    key = f"{Path(prompts_path).resolve()}:{st.st_mtime_ns}:{st.st_size}:{limit}"
+    cache_path = cache_dir / "prompts" / f"{hashlib.md5(key.encode()).hexdigest()}.pkl"
+    if cache_path.is_file():
+        try:
+            return pickle.loads(cache_path.read_bytes())
+        except Exception as exc:
+            logging.warning(f"Ignoring unreadable prompts cache {cache_path}: {exc}")
+    scenes = _parse_prompts(prompts_path, limit)
+    _cache_store(cache_path, pickle.dumps(scenes, protocol=pickle.HIGHEST_PROTOCOL))
     return scenes
 
 
-def ensure_api_key() -> None:
-    """Check for API key in env, load from local.env if available, or prompt interactively."""
-    global client
+def _parse_prompts(prompts_path: str, limit: int | None) -> list:
+    with open(prompts_path, "rb") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first != b"[":
+            raise ValueError("prompts.json must contain a list of scenes")
+        f.seek(0)
+
+        items = ijson.items(f, "item", use_float=True) if ijson is not None else json.load(f)
+        scenes = []
+        for scene in items:
+            # Guard against missing index before comparing to limit
+            idx = scene.get("index")
+            if idx is None or (limit is not None and idx > limit):
+                continue
+            scenes.append(scene)
+            if limit is not None and len(scenes) >= limit:
+                break
+    return scenes
 
-    # Try loading from local.env file if it exists
+
+def ensure_api_key() -> str:
+    """Check for API key in env, load from local.env if available, or prompt interactively.
+
+    Only the first call does any work; use reset_api_key() to force a reload.
+    """
+    global _api_key
+    if _api_key is not None:
+        return _api_key
+
+    # Try loading from local.env file if it exists (variables already set in the environment win)
     env_file_path = Path(__file__).parent / "local.env"
     if env_file_path.exists():
-        with open(env_file_path, encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                if "=" in line:
-                    key, value = line.split("=", 1)
-                    key = key.strip()
-                    value = value.strip().strip('"').strip("'")
-                    os.environ[key] = value
+        from dotenv import load_dotenv
+
+        load_dotenv(env_file_path, override=False)
 
     # Now check OPENAI_API_KEY
     api_key = os.getenv("OPENAI_API_KEY")
@@ -162,127 +323,439 @@ def ensure_api_key() -> None:
             raise ValueError("No API key provided.")
         os.environ["OPENAI_API_KEY"] = api_key
 
-    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    _api_key = api_key
+    return api_key
+
+
+def reset_api_key() -> None:
+    """Forget the cached key so the next ensure_api_key() re-reads local.env and the environment."""
+    global _api_key
+    _api_key = None
 
 
 # ---------- Preflight runner ----------
 def run_preflight(script_dir: Path) -> None:
-    """Run preflight.py (Black and Ruff). Abort if it fails."""
-    preflight = script_dir / "preflight.py"
+    """Run scripts/preflight.py once per process. Abort if it fails.
+
+    Preflight auto-fixes and re-formats ``src/`` and ``tests/`` with Ruff and Black before
+    checking them. If either tool isn't installed it only warns, so generation still runs.
+    """
+    global _preflight_done
+    if _preflight_done:
+        return
+    preflight = script_dir / "scripts" / "preflight.py"
     if not preflight.exists():
-        logging.warning("preflight.py not found. Skipping preflight checks.")
+        logging.warning("scripts/preflight.py not found. Skipping preflight checks.")
+        return
+    if os.getenv("PRE_COMMIT") or os.getenv("CI"):
+        logging.info("Running under pre-commit/CI, which already runs preflight. Skipping preflight checks.")
         return
-    logging.info("Running preflight checks (black, flake8, mypy, pytest)…")
-    cmd = f'"{sys.executable}" "{preflight}"'
-    result = subprocess.run(cmd, shell=True)
-    if result.returncode != 0:
+    logging.info("Running preflight checks (ruff, black); they may rewrite src/ and tests/…")
+    spec = importlib.util.spec_from_file_location("preflight", preflight)
+    if spec is None or spec.loader is None:
+        # Can't import it as a module: run it in its own interpreter (argv list, no shell).
+        returncode = subprocess.run([sys.executable, str(preflight), "--skip-missing-tools"]).returncode
+    else:
+        # Import and call main() in-process to save an interpreter start and a shell.
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+            module.main(["--skip-missing-tools"])  # don't let preflight's argparse see our own argv
+            returncode = 0
+        except SystemExit as exc:
+            returncode = exc.code if isinstance(exc.code, int) else int(exc.code is not None)
+    if returncode != 0:
         raise SystemExit("Preflight checks failed. Fix issues and re-run.")
+    _preflight_done = True
 
 
 # -------------------------------------
 
 
 # ---------- Optional 1-shot smoke test ----------
-def smoke_test() -> None:
+async def smoke_test() -> None:
     """Try a tiny generation to catch auth/billing/access errors before full run."""
     logging.info("Running smoke test (one 256x256 render)…")
     prompt = "a single red cube on a clean white background, studio lighting"
     try:
-        r = client.images.generate(model="gpt-image-1", prompt=prompt, size="256x256", n=1)
+        r = await client.images.generate(model=IMAGE_MODEL, prompt=prompt, size="256x256", n=1)
         # Touch the base64 only to ensure response structure is valid:
         _ = base64.b64decode(r.data[0].b64_json)
         logging.info("Smoke test OK.")
     except Exception as exc:
-        if _is_hard_limit_error(exc):
-            logging.error("❌ Billing hard limit reached during smoke test. Aborting.")
-            raise SystemExit(1) from None
-        if _is_auth_error(exc):
-            logging.error("❌ Authentication error during smoke test. Check OPENAI_API_KEY. Aborting.")
-            raise SystemExit(1) from None
-        if _is_forbidden_needs_verification(exc):
-            logging.error(
-                "❌ Access denied for gpt-image-1 during smoke test. Verify org/billing/model access. Aborting."
-            )
-            raise SystemExit(1) from None
-        if _is_bad_request(exc):
-            logging.error(f"❌ Bad request during smoke test: {exc}")
-            raise SystemExit(1) from None
-        logging.error(f"❌ Unexpected error during smoke test: {exc}")
+        match _classify(exc):
+            case ErrorKind.HARD_LIMIT:
+                logging.error("❌ Billing hard limit reached during smoke test. Aborting.")
+            case ErrorKind.AUTH:
+                logging.error("❌ Authentication error during smoke test. Check OPENAI_API_KEY. Aborting.")
+            case ErrorKind.FORBIDDEN:
+                logging.error(
+                    "❌ Access denied for gpt-image-1 during smoke test. Verify org/billing/model access. Aborting."
+                )
+            case ErrorKind.BAD_REQUEST:
+                logging.error(f"❌ Bad request during smoke test: {exc}")
+            case _:
+                logging.error(f"❌ Unexpected error during smoke test: {exc}")
         raise SystemExit(1) from None
 
 
 # -----------------------------------------------
 
 
-def generate_image(prompt: str, size: str, index: int, frames_dir: Path) -> Path:
-    """Send a prompt to GPT-Image-1 API and save result."""
+def _write_direct(path: Path, data: bytes) -> None:
+    """Write ``data`` with O_DIRECT so it doesn't linger in the page cache."""
+    # O_DIRECT needs a page-aligned buffer and length; anonymous mmaps are page-aligned.
+    padded = -(-len(data) // mmap.PAGESIZE) * mmap.PAGESIZE
+    with mmap.mmap(-1, padded) as buf:
+        buf.write(data)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DIRECT, 0o666)
+        try:
+            with memoryview(buf) as view:
+                offset = 0
+                while offset < padded:
+                    offset += os.write(fd, view[offset:])
+            os.ftruncate(fd, len(data))  # drop the alignment padding
+        finally:
+            os.close(fd)
+
+
+def _write_bytes(path: Path, data: bytes) -> None:
+    """Write a PNG in one call, bypassing the page cache for large frames on platforms with O_DIRECT."""
+    if len(data) >= DIRECT_IO_MIN_BYTES and hasattr(os, "O_DIRECT"):
+        try:
+            _write_direct(path, data)
+            return
+        except OSError:
+            pass  # e.g. tmpfs and some network filesystems reject O_DIRECT
+    path.write_bytes(data)
+
+
+# ---------- Prompt → image cache ----------
+def _cache_path(cache_dir: Path, prompt: str, size: str, variant: int = 0) -> Path:
+    """Cache file for the ``variant``-th scene sharing ``prompt`` (0 for a prompt used once)."""
+    key_source = f"{IMAGE_MODEL}|{size}|{prompt}" + (f"|{variant}" if variant else "")
+    key = hashlib.sha256(key_source.encode()).hexdigest()
+    return cache_dir / key[:2] / f"{key}.png"
+
+
+def _cache_store(cache_path: Path, data: bytes) -> None:
+    """Write a cache entry atomically so concurrent runs never see a partial file."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        _write_bytes(Path(tmp), data)
+        os.replace(tmp, cache_path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+# ------------------------------------------
+
+
+def _save_frame(frame_path: Path, img_bytes: bytes, link_target: Path | None = None) -> None:
+    """Write a frame PNG, or symlink it to its cache entry when ``link_target`` is given."""
+    # Drop stale files and dangling links left behind by a cleared cache.
+    frame_path.unlink(missing_ok=True)
+    if link_target is not None:
+        try:
+            os.symlink(link_target.resolve(), frame_path)
+            return
+        except OSError:
+            pass  # e.g. Windows without symlink privilege: fall back to a copy
+    _write_bytes(frame_path, img_bytes)
+
+
+def _persist_frame(b64_data: str, frame_path: Path | None, cache_path: Path | None, link_to_cache: bool) -> bytes:
+    """Decode an API image and write it to the cache and frames dir. Runs on ``_io_pool``."""
+    img_bytes = base64.b64decode(b64_data)
+    if cache_path is not None:
+        _cache_store(cache_path, img_bytes)
+    if frame_path is not None:
+        _save_frame(frame_path, img_bytes, cache_path if link_to_cache else None)
+    return img_bytes
+
+
+def _restore_frame(cache_path: Path, frame_path: Path | None, link_to_cache: bool) -> bytes:
+    """Read a cached image and write it to the frames dir. Runs on ``_io_pool``."""
+    img_bytes = cache_path.read_bytes()
+    if frame_path is not None:
+        _save_frame(frame_path, img_bytes, cache_path if link_to_cache else None)
+    return img_bytes
+
+
+async def generate_images(
+    prompt: str,
+    size: str,
+    indexes: list[int],
+    frames_dir: Path | None,
+    bucket: TokenBucket | None = None,
+    cache_dir: Path | None = None,
+    link_to_cache: bool = False,
+    sem: asyncio.Semaphore | None = None,
+    variants: list[int] | None = None,
+) -> list[tuple[int, bytes]]:
+    """Fetch frames for scenes sharing ``prompt`` from the cache or the GPT-Image-1 API.
+
+    Each scene is cached under its position among the scenes sharing ``prompt``
+    (``variants``, one per index; defaults to ``0, 1, ...``), so a rerun restores every frame unchanged.
+    Saves each PNG to ``frames_dir`` (unless it is None) and returns ``(index, bytes)`` pairs.
+    Only API calls are held under ``sem``; decoding and writing happen on ``_io_pool``.
+    """
+    loop = asyncio.get_running_loop()
+    frame_paths = [frames_dir / f"frame_{index:03d}.png" if frames_dir else None for index in indexes]
+    if variants is None:
+        variants = list(range(len(indexes)))
+    cache_paths = [
+        _cache_path(cache_dir, prompt, size, variant) if cache_dir is not None else None for variant in variants
+    ]
+    hits = [i for i, cache_path in enumerate(cache_paths) if cache_path is not None and cache_path.is_file()]
+    misses = [i for i in range(len(indexes)) if i not in hits]
+
+    jobs = [loop.run_in_executor(_io_pool, _restore_frame, cache_paths[i], frame_paths[i], link_to_cache) for i in hits]
+    if hits:
+        logging.debug(f"Cache hit for frames {[indexes[i] for i in hits]}")
+    if misses:
+        b64_images = await _request_images(prompt, size, [indexes[i] for i in misses], bucket, sem)
+        jobs += [
+            loop.run_in_executor(_io_pool, _persist_frame, b64_data, frame_paths[i], cache_paths[i], link_to_cache)
+            for i, b64_data in zip(misses, b64_images, strict=True)
+        ]
+    img_bytes = [b""] * len(indexes)
+    for i, data in zip(hits + misses, await asyncio.gather(*jobs), strict=True):
+        img_bytes[i] = data
+
+    for index, path in zip(indexes, frame_paths, strict=True):
+        logging.info(f"Frame {index} saved to {path}" if path else f"Frame {index} ready (in memory)")
+    # Hand the PNG bytes on as-is; ffmpeg decodes them straight from its stdin pipe.
+    return list(zip(indexes, img_bytes, strict=True))
+
+
+async def _request_images(
+    prompt: str,
+    size: str,
+    indexes: list[int],
+    bucket: TokenBucket | None,
+    sem: asyncio.Semaphore | None,
+) -> list[str]:
+    """Request one image per index, as a single ``n=len(indexes)`` call when the API accepts it."""
+
+    async def request(index: int, n: int) -> list[str]:
+        async with sem if sem is not None else contextlib.nullcontext():
+            return await _request_image(prompt, size, index, bucket, n=n)
+
+    if len(indexes) > 1:
+        try:
+            images = await request(indexes[0], len(indexes))
+            if len(images) == len(indexes):
+                return images
+            logging.warning(f"Batch for frames {indexes} returned {len(images)} images; requesting one per frame.")
+        except Exception as exc:
+            if _classify(exc) is not ErrorKind.BAD_REQUEST:
+                raise
+            logging.warning(f"Batch request for frames {indexes} rejected ({exc}); requesting one per frame.")
+
+    results = await asyncio.gather(*(request(index, 1) for index in indexes))
+    return [images[0] for images in results]
+
+
+async def _request_image(prompt: str, size: str, index: int, bucket: TokenBucket | None, n: int = 1) -> list[str]:
+    """Call the images API with retry/backoff and return ``n`` base64-encoded PNGs."""
     backoff = 1.0
     while True:
         try:
+            if bucket is not None:
+                await bucket.acquire()
             logging.debug(f"Sending request for frame {index} with size {size}")
-            response = client.images.generate(model="gpt-image-1", prompt=prompt, size=size, n=1)
+            response = await client.images.generate(model=IMAGE_MODEL, prompt=prompt, size=size, n=n)
             break  # success
         except Exception as exc:
-            # Hard stop cases — don't retry
-            if _is_hard_limit_error(exc):
-                logging.error(
-                    "❌ Billing hard limit reached. "
-                    "Increase your monthly limit, wait for cycle reset, or use another key. Aborting."
-                )
-                raise SystemExit(1) from None
-            if _is_auth_error(exc):
-                logging.error("❌ Authentication error calling OpenAI. Check OPENAI_API_KEY. Aborting.")
-                raise SystemExit(1) from None
-            if _is_forbidden_needs_verification(exc):
-                logging.error(
-                    "❌ Access denied for gpt-image-1.\n"
-                    "- Verify your organization and enable billing for this project.\n"
-                    "- Ensure the API key belongs to a project with model access.\n"
-                    "- Optionally set OPENAI_ORG_ID / OPENAI_PROJECT.\n"
-                    "Aborting."
-                )
-                raise SystemExit(1) from None
-            if _is_bad_request(exc):
-                logging.error(
-                    f"❌ Bad request for frame {index}: {exc}\n"
-                    "Check your 'size' (e.g., 1024x1024) and prompt contents. Aborting."
-                )
-                raise
+            match _classify(exc):
+                # Hard stop cases — don't retry
+                case ErrorKind.HARD_LIMIT:
+                    logging.error(
+                        "❌ Billing hard limit reached. "
+                        "Increase your monthly limit, wait for cycle reset, or use another key. Aborting."
+                    )
+                    raise SystemExit(1) from None
+                case ErrorKind.AUTH:
+                    logging.error("❌ Authentication error calling OpenAI. Check OPENAI_API_KEY. Aborting.")
+                    raise SystemExit(1) from None
+                case ErrorKind.FORBIDDEN:
+                    logging.error(
+                        "❌ Access denied for gpt-image-1.\n"
+                        "- Verify your organization and enable billing for this project.\n"
+                        "- Ensure the API key belongs to a project with model access.\n"
+                        "- Optionally set OPENAI_ORG_ID / OPENAI_PROJECT.\n"
+                        "Aborting."
+                    )
+                    raise SystemExit(1) from None
+                case ErrorKind.BAD_REQUEST:
+                    if n > 1:
+                        raise  # caller falls back to one image per request
+                    logging.error(
+                        f"❌ Bad request for frame {index}: {exc}\n"
+                        "Check your 'size' (e.g., 1024x1024) and prompt contents. Aborting."
+                    )
+                    raise
+                case ErrorKind.FATAL:
+                    logging.error(f"❌ Unrecoverable error for frame {index}: {exc}. Aborting.")
+                    raise
+                case ErrorKind.RATE_LIMIT if bucket is not None:
+                    bucket.penalize()
 
-            # Otherwise: assume transient (429/5xx/network) → retry with backoff
+            # Otherwise: transient (429/5xx/network) → retry with backoff
             logging.warning(f"Error while requesting image for frame {index}: {exc}. Retrying in {backoff:.1f}s...")
-            time.sleep(backoff)
+            await asyncio.sleep(backoff)
             backoff = min(backoff * 2, 60.0)
 
-    b64_data = response.data[0].b64_json
-    img_bytes = base64.b64decode(b64_data)
-    frame_path = frames_dir / f"frame_{index:03d}.png"
-    with open(frame_path, "wb") as f:
-        f.write(img_bytes)
-    logging.info(f"Frame {index} saved to {frame_path}")
-    return frame_path
+    return [image.b64_json for image in response.data]
+
+
+def _find_ffmpeg() -> str:
+    """Locate an ffmpeg binary: PATH first, then the one bundled with imageio-ffmpeg."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        return ffmpeg
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        raise RuntimeError("ffmpeg not found. Install it or add it to PATH.") from None
+    return imageio_ffmpeg.get_ffmpeg_exe()
 
 
 def make_video(
-    frame_paths: list,
+    frames: list[bytes],
     output_file: str,
     fps: int,
     kenburns: bool,
     audio_path: str | None,
 ) -> None:
-    if not frame_paths:
-        raise ValueError("No frame paths provided to make video")
-    clip = ImageSequenceClip([str(p) for p in frame_paths], fps=fps)
+    """Pipe PNG-encoded frames into a single ffmpeg process to encode the video."""
+    if not frames:
+        raise ValueError("No frames provided to make video")
+    cmd = [_find_ffmpeg(), "-y", "-loglevel", "error", "-f", "image2pipe", "-framerate", str(fps), "-i", "-"]
+    if audio_path:
+        if Path(audio_path).is_file():
+            cmd += ["-i", audio_path]
+        else:
+            logging.warning(f"Failed to load audio {audio_path}: file not found")
+            audio_path = None
+    cmd += ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"]
     if audio_path:
+        cmd += ["-c:a", "aac", "-shortest"]
+    cmd.append(output_file)
+    logging.debug(f"Running ffmpeg: {cmd}")
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        for png_bytes in frames:
+            proc.stdin.write(png_bytes)
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its return code below carries the failure
+    finally:
         try:
-            audio_clip = AudioFileClip(audio_path)
-            clip = clip.set_audio(audio_clip)
-        except Exception as exc:
-            logging.warning(f"Failed to load audio {audio_path}: {exc}")
-    clip.write_videofile(output_file, fps=fps)
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed with exit code {proc.returncode} while writing {output_file}")
     logging.info(f"Video written to {output_file}")
 
 
+async def generate_frames(scenes: list, args: argparse.Namespace, frames_dir: Path | None) -> list[bytes]:
+    """Generate every scene's frame on one event loop, at most ``args.threads`` requests in flight.
+
+    Frames are returned in scene-index order.
+    """
+    global client
+    from openai import AsyncOpenAI
+
+    # A fresh client per event loop: its httpx pool is bound to the loop that opened it.
+    async with AsyncOpenAI(api_key=ensure_api_key()) as client:
+        try:
+            return await _generate_frames(scenes, args, frames_dir)
+        finally:
+            client = None
+
+
+async def _generate_frames(scenes: list, args: argparse.Namespace, frames_dir: Path | None) -> list[bytes]:
+    from tqdm import tqdm  # progress bars
+    from tqdm.asyncio import tqdm as tqdm_asyncio
+
+    if args.smoke_test:
+        await smoke_test()
+
+    # Each result lands in its scene's slot, so the output is ordered by construction.
+    index_to_pos = {idx: pos for pos, idx in enumerate(sorted(scene["index"] for scene in scenes))}
+    if len(index_to_pos) != len(scenes):
+        raise ValueError("Each scene must have a unique 'index'")
+    frames: list[bytes | None] = [None] * len(scenes)
+    sem = asyncio.Semaphore(args.threads)
+    bucket = TokenBucket(args.rpm)
+    cache_dir = None if args.no_cache else Path(args.cache_dir).expanduser()
+
+    # A scene's cache entry is its position, by index, among all scenes sharing its prompt.
+    # Number them before --skip-existing drops any, so the numbering is the same on every run.
+    variants: dict[int, int] = {}
+    seen: dict[str, int] = {}
+    for scene in sorted(scenes, key=lambda s: s["index"]):
+        prompt = scene.get("prompt_text")
+        variants[scene["index"]] = seen.get(prompt, 0)
+        seen[prompt] = variants[scene["index"]] + 1
+
+    async def one(prompt: str, indexes: list[int]) -> list[tuple[int, bytes]]:
+        try:
+            return await generate_images(
+                prompt,
+                args.size,
+                indexes,
+                frames_dir,
+                bucket,
+                cache_dir,
+                link_to_cache=args.skip_existing,
+                sem=sem,
+                variants=[variants[idx] for idx in indexes],
+            )
+        except Exception as exc:
+            logging.error(f"Image generation failed for scene(s) {indexes}: {exc}")
+            raise
+
+    # Queue image generation jobs with a progress bar; scenes with identical prompts share a request
+    groups: dict[str, list[int]] = {}
+    for scene in tqdm(scenes, desc="Queueing scenes", unit="scene"):
+        idx = scene.get("index")
+        if idx is None:
+            raise ValueError("Each scene must contain an 'index' field")
+        title = scene.get("title", f"Scene {idx}")
+        role = scene.get("narrative_role", "")
+        prompt = scene.get("prompt_text")
+        if not prompt:
+            raise ValueError(f"Scene {idx} is missing a 'prompt_text'")
+        logging.info(f"Queueing image {idx}: {title} ({role})")
+        logging.debug(f"Prompt for scene {idx}: {prompt}")
+        if args.skip_existing:
+            frame_file = frames_dir / f"frame_{idx:03d}.png"
+            if frame_file.exists():
+                logging.info(f"Skipping existing frame for scene {idx} at {frame_file}")
+                frames[index_to_pos[idx]] = frame_file.read_bytes()
+                continue
+        groups.setdefault(prompt, []).append(idx)
+
+    jobs = [
+        one(prompt, indexes[i : i + MAX_IMAGES_PER_REQUEST])
+        for prompt, indexes in groups.items()
+        for i in range(0, len(indexes), MAX_IMAGES_PER_REQUEST)
+    ]
+
+    # Completion progress bar
+    for results in await tqdm_asyncio.gather(*jobs, desc="Generating images", unit="req"):
+        for idx, frame in results:
+            frames[index_to_pos[idx]] = frame
+    return frames
+
+
 def main() -> None:
     args = parse_args()
     setup_logging(args.quiet)
@@ -294,61 +767,18 @@ def main() -> None:
 
     ensure_api_key()
 
-    if args.smoke_test:
-        smoke_test()
-
-    frames_dir = Path(args.frames_dir)
-    frames_dir.mkdir(parents=True, exist_ok=True)
-
-    scenes = load_prompts(args.prompts_file)
-    # Guard against missing index before comparing to max_images
-    scenes = [
-        s for s in scenes
-        if s.get("index") is not None and s["index"] <= args.max_images
-    ][: args.max_images]
+    frames_dir = None
+    if not args.no_frames_dir:
+        frames_dir = Path(args.frames_dir)
+        frames_dir.mkdir(parents=True, exist_ok=True)
 
-    frame_paths: list[Path] = []
-
-    # Submit image generation jobs with a progress bar
-    with ThreadPoolExecutor(max_workers=args.threads) as executor:
-        future_to_idx = {}
-        for scene in tqdm(scenes, desc="Queueing scenes", unit="scene"):
-            idx = scene.get("index")
-            if idx is None:
-                raise ValueError("Each scene must contain an 'index' field")
-            title = scene.get("title", f"Scene {idx}")
-            role = scene.get("narrative_role", "")
-            prompt = scene.get("prompt_text")
-            if not prompt:
-                raise ValueError(f"Scene {idx} is missing a 'prompt_text'")
-            logging.info(f"Queueing image {idx}: {title} ({role})")
-            logging.debug(f"Prompt for scene {idx}: {prompt}")
-            frame_file = frames_dir / f"frame_{idx:03d}.png"
-            if args.skip_existing and frame_file.exists():
-                logging.info(f"Skipping existing frame for scene {idx} at {frame_file}")
-                frame_paths.append(frame_file)
-                continue
-            future = executor.submit(generate_image, prompt, args.size, idx, frames_dir)
-            future_to_idx[future] = idx
-
-        # Completion progress bar
-        with tqdm(total=len(future_to_idx), desc="Generating images", unit="img") as pbar:
-            for future in as_completed(future_to_idx):
-                idx = future_to_idx[future]
-                try:
-                    frame_path = future.result()
-                    frame_paths.append(frame_path)
-                except Exception as exc:
-                    logging.error(f"Image generation failed for scene {idx}: {exc}")
-                    raise
-                finally:
-                    pbar.update(1)
+    prompts_cache = Path(args.cache_dir).expanduser() if args.cache_prompts else None
+    scenes = load_prompts(args.prompts_file, args.max_images, prompts_cache)
 
-    # Sort frame paths to ensure correct order
-    frame_paths_sorted = sorted(frame_paths, key=lambda p: p.name)
+    frames = asyncio.run(generate_frames(scenes, args, frames_dir))
 
     print("\nAssembling video…")
-    make_video(frame_paths_sorted, args.output_file, args.fps, args.kenburns, args.audio)
+    make_video(frames, args.output_file, args.fps, args.kenburns, args.audio)
 
 
 if __name__ == "__main__":
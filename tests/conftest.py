@@ -1,7 +1,23 @@
+import importlib.machinery
+import importlib.util
 import sys
 from pathlib import Path
 
+import pytest
+
 # Ensure src/ is importable during tests (cross-platform)
 src = Path(__file__).resolve().parents[1] / "src"
 if str(src) not in sys.path:
     sys.path.insert(0, str(src))
+
+
+@pytest.fixture
+def story_to_video():
+    """A fresh copy of the top-level story_to_video.py script, loaded as a module."""
+    loader = importlib.machinery.SourceFileLoader(
+        "story_to_video", str(Path(__file__).resolve().parents[1] / "story_to_video.py")
+    )
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
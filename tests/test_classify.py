@@ -0,0 +1,33 @@
+import pytest
+
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/images/generations")
+
+
+def status_error(cls, status, body=None):
+    return cls("error", response=httpx.Response(status, request=REQUEST), body=body)
+
+
+@pytest.mark.parametrize(
+    ("exc", "kind"),
+    [
+        (status_error(openai.BadRequestError, 400, {"code": "billing_hard_limit_reached"}), "HARD_LIMIT"),
+        (status_error(openai.RateLimitError, 429, {"code": "insufficient_quota"}), "HARD_LIMIT"),
+        (status_error(openai.AuthenticationError, 401), "AUTH"),
+        (status_error(openai.PermissionDeniedError, 403), "FORBIDDEN"),
+        (status_error(openai.BadRequestError, 400), "BAD_REQUEST"),
+        (status_error(openai.RateLimitError, 429), "RATE_LIMIT"),
+        (status_error(openai.NotFoundError, 404), "FATAL"),
+        (status_error(openai.UnprocessableEntityError, 422), "FATAL"),
+        (status_error(openai.APIStatusError, 418), "FATAL"),
+        (ValueError("bug"), "FATAL"),
+        (status_error(openai.InternalServerError, 500), "TRANSIENT"),
+        (status_error(openai.InternalServerError, 503), "TRANSIENT"),
+        (openai.APIConnectionError(request=REQUEST), "TRANSIENT"),
+        (openai.APITimeoutError(request=REQUEST), "TRANSIENT"),
+    ],
+)
+def test_classify(story_to_video, exc, kind):
+    assert story_to_video._classify(exc) is story_to_video.ErrorKind[kind]
@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+
+def test_ensure_api_key_is_memoized(story_to_video, tmp_path, monkeypatch):
+    story_to_video.__file__ = str(tmp_path / "story_to_video.py")
+    env_file = tmp_path / "local.env"
+    env_file.write_text("OPENAI_API_KEY=sk-first\n", encoding="utf-8")
+    monkeypatch.setenv("OPENAI_API_KEY", "unset-below")
+    monkeypatch.delenv("OPENAI_API_KEY")
+
+    assert story_to_video.ensure_api_key() == "sk-first"
+
+    env_file.write_text("OPENAI_API_KEY=sk-second\n", encoding="utf-8")
+    monkeypatch.delenv("OPENAI_API_KEY")
+    assert story_to_video.ensure_api_key() == "sk-first"  # local.env isn't read again
+
+    story_to_video.reset_api_key()
+    assert story_to_video.ensure_api_key() == "sk-second"
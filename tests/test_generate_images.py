@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import shutil
+import types
+
+import pytest
+
+
+class FakeImages:
+    """Stands in for ``client.images``: every image it returns is unique."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, model, prompt, size, n=1):
+        self.calls.append(n)
+        data = [
+            types.SimpleNamespace(b64_json=base64.b64encode(f"png-{len(self.calls)}-{k}".encode()).decode())
+            for k in range(n)
+        ]
+        return types.SimpleNamespace(data=data)
+
+
+def _generate(module, indexes, frames_dir, cache_dir, **kwargs):
+    return asyncio.run(
+        module.generate_images("same prompt", "1024x1024", indexes, frames_dir, None, cache_dir, **kwargs)
+    )
+
+
+def test_batched_frames_survive_a_cached_rerun(story_to_video, tmp_path):
+    images = FakeImages()
+    story_to_video.client = types.SimpleNamespace(images=images)
+    frames_dir, cache_dir = tmp_path / "frames", tmp_path / "cache"
+    frames_dir.mkdir()
+
+    first = _generate(story_to_video, [2, 3, 4], frames_dir, cache_dir)
+    assert images.calls == [3]
+    assert len({data for _, data in first}) == 3
+    before = {p.name: p.read_bytes() for p in frames_dir.iterdir()}
+
+    second = _generate(story_to_video, [2, 3, 4], frames_dir, cache_dir)
+    assert images.calls == [3]  # served entirely from the cache
+    assert second == first
+    assert {p.name: p.read_bytes() for p in frames_dir.iterdir()} == before
+
+
+def _dirs(tmp_path):
+    frames_dir, cache_dir = tmp_path / "frames", tmp_path / "cache"
+    frames_dir.mkdir()
+    return frames_dir, cache_dir
+
+
+def test_cache_hit_makes_no_api_call(story_to_video, tmp_path):
+    images = FakeImages()
+    story_to_video.client = types.SimpleNamespace(images=images)
+    frames_dir, cache_dir = _dirs(tmp_path)
+    story_to_video._cache_store(story_to_video._cache_path(cache_dir, "same prompt", "1024x1024"), b"cached")
+
+    assert _generate(story_to_video, [1], frames_dir, cache_dir) == [(1, b"cached")]
+    assert images.calls == []
+    assert (frames_dir / "frame_001.png").read_bytes() == b"cached"
+
+
+def test_cache_store_leaves_no_partial_files(story_to_video, tmp_path, monkeypatch):
+    entry = story_to_video._cache_path(tmp_path, "prompt", "1024x1024")
+    story_to_video._cache_store(entry, b"png")
+    assert entry.read_bytes() == b"png"
+
+    def broken_write(path, data):
+        path.write_bytes(data[:1])
+        raise OSError("disk full")
+
+    monkeypatch.setattr(story_to_video, "_write_bytes", broken_write)
+    other = story_to_video._cache_path(tmp_path, "other prompt", "1024x1024")
+    with pytest.raises(OSError):
+        story_to_video._cache_store(other, b"png")
+    assert not other.exists()
+    assert sorted(p.name for p in entry.parent.parent.rglob("*") if p.is_file()) == [entry.name]
+
+
+def test_link_to_cache_symlinks_frames(story_to_video, tmp_path):
+    story_to_video.client = types.SimpleNamespace(images=FakeImages())
+    frames_dir, cache_dir = _dirs(tmp_path)
+
+    [(_, data)] = _generate(story_to_video, [1], frames_dir, cache_dir, link_to_cache=True)
+    frame = frames_dir / "frame_001.png"
+    assert frame.is_symlink()
+    assert frame.resolve() == story_to_video._cache_path(cache_dir, "same prompt", "1024x1024").resolve()
+    assert frame.read_bytes() == data
+
+
+def _args(cache_dir):
+    return types.SimpleNamespace(
+        smoke_test=False,
+        threads=1,
+        rpm=600,
+        no_cache=False,
+        cache_dir=str(cache_dir),
+        size="1024x1024",
+        skip_existing=True,
+    )
+
+
+def test_skip_existing_regenerates_dangling_links(story_to_video, tmp_path):
+    pytest.importorskip("tqdm")  # _generate_frames draws progress bars
+    images = FakeImages()
+    story_to_video.client = types.SimpleNamespace(images=images)
+    frames_dir, cache_dir = _dirs(tmp_path)
+    scenes = [{"index": 1, "prompt_text": "same prompt"}]
+    args = _args(cache_dir)
+
+    first = asyncio.run(story_to_video._generate_frames(scenes, args, frames_dir))
+    assert images.calls == [1]
+    assert asyncio.run(story_to_video._generate_frames(scenes, args, frames_dir)) == first
+    assert images.calls == [1]  # the linked frame was reused
+
+    shutil.rmtree(cache_dir)  # leaves frame_001.png dangling
+    regenerated = asyncio.run(story_to_video._generate_frames(scenes, args, frames_dir))
+    assert images.calls == [1, 1]
+    frame = frames_dir / "frame_001.png"
+    assert frame.is_symlink() and frame.exists()
+    assert frame.read_bytes() == regenerated[0] != first[0]
+
+
+def test_skip_existing_restores_a_deleted_frame_from_its_own_cache_entry(story_to_video, tmp_path):
+    pytest.importorskip("tqdm")  # _generate_frames draws progress bars
+    images = FakeImages()
+    story_to_video.client = types.SimpleNamespace(images=images)
+    frames_dir, cache_dir = _dirs(tmp_path)
+    scenes = [{"index": i, "prompt_text": "same prompt"} for i in (3, 1, 2)]
+    args = _args(cache_dir)
+
+    first = asyncio.run(story_to_video._generate_frames(scenes, args, frames_dir))
+    assert len(set(first)) == 3
+
+    (frames_dir / "frame_002.png").unlink()
+    assert asyncio.run(story_to_video._generate_frames(scenes, args, frames_dir)) == first
+    assert images.calls == [3]
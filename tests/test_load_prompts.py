@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+
+def test_load_prompts_filters_and_limits(story_to_video, tmp_path):
+    scenes = [{"index": 3}, {"title": "no index"}, {"index": 1}, {"index": 9}, {"index": 2}, {"index": 1}]
+    prompts = tmp_path / "prompts.json"
+    prompts.write_text(json.dumps(scenes), encoding="utf-8")
+
+    assert story_to_video.load_prompts(str(prompts), 3) == [{"index": 3}, {"index": 1}, {"index": 2}]
+    assert story_to_video.load_prompts(str(prompts)) == [s for s in scenes if "index" in s]
+
+
+def test_load_prompts_rejects_non_list(story_to_video, tmp_path):
+    prompts = tmp_path / "prompts.json"
+    prompts.write_text('  {"index": 1}', encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        story_to_video.load_prompts(str(prompts), 3)
+
+
+def test_load_prompts_cache_tracks_file_changes(story_to_video, tmp_path):
+    prompts = tmp_path / "prompts.json"
+    cache_dir = tmp_path / "cache"
+    prompts.write_text(json.dumps([{"index": 1}, {"index": 2}]), encoding="utf-8")
+
+    assert story_to_video.load_prompts(str(prompts), 2, cache_dir) == [{"index": 1}, {"index": 2}]
+    assert len(list((cache_dir / "prompts").glob("*.pkl"))) == 1
+    assert story_to_video.load_prompts(str(prompts), 2, cache_dir) == [{"index": 1}, {"index": 2}]
+
+    prompts.write_text(json.dumps([{"index": 2, "title": "changed"}]), encoding="utf-8")
+    assert story_to_video.load_prompts(str(prompts), 2, cache_dir) == [{"index": 2, "title": "changed"}]
@@ -0,0 +1,50 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+PREFLIGHT = Path(__file__).resolve().parents[1] / "scripts" / "preflight.py"
+
+
+@pytest.fixture
+def preflight():
+    spec = importlib.util.spec_from_file_location("preflight", PREFLIGHT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _exit(code):
+    return [sys.executable, "-c", f"import sys; sys.exit({code})"]
+
+
+def test_run_parallel_reports_the_highest_exit_code(preflight, tmp_path):
+    checks = [("ok", _exit(0)), ("lint", _exit(1)), ("format", _exit(3))]
+    assert preflight.run_parallel(checks, tmp_path, 2) == 3
+
+
+def test_run_parallel_passes_when_every_check_passes(preflight, tmp_path):
+    checks = [("a", _exit(0)), ("b", _exit(0))]
+    assert preflight.run_parallel(checks, tmp_path, 2) == 0
+
+
+@pytest.fixture
+def no_black(preflight, monkeypatch):
+    calls = []
+    monkeypatch.setattr(preflight, "resolve_env", lambda root: (sys.executable, root))
+    monkeypatch.setattr(preflight, "tool_available", lambda cmd: "black" not in cmd)
+    monkeypatch.setattr(preflight, "run", lambda desc, cmd, cwd: calls.append(desc) or 0)
+    return calls
+
+
+def test_missing_tool_is_skipped_when_asked(preflight, no_black):
+    preflight.main(["--skip-missing-tools"])
+    assert no_black == []
+
+
+def test_missing_tool_fails_by_default(preflight, no_black):
+    with pytest.raises(SystemExit) as exc:
+        preflight.main([])
+    assert exc.value.code == 1
+    assert no_black == []
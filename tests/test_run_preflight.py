@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.delenv("PRE_COMMIT", raising=False)
+    monkeypatch.delenv("CI", raising=False)
+    (tmp_path / "scripts").mkdir()
+    return tmp_path
+
+
+def test_failing_preflight_aborts(story_to_video, project):
+    (project / "scripts" / "preflight.py").write_text("import sys\n\ndef main(argv=None):\n    sys.exit(1)\n")
+    with pytest.raises(SystemExit, match="Preflight checks failed"):
+        story_to_video.run_preflight(project)
+    assert not story_to_video._preflight_done
+
+
+def test_passing_preflight_runs_once(story_to_video, project):
+    marker = project / "calls"
+    (project / "scripts" / "preflight.py").write_text(
+        f"from pathlib import Path\n\ndef main(argv=None):\n"
+        f"    with Path({str(marker)!r}).open('a') as f:\n        f.write('x')\n"
+    )
+    story_to_video.run_preflight(project)
+    story_to_video.run_preflight(project)
+    assert marker.read_text() == "x"
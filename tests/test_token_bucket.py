@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def clock(story_to_video, monkeypatch):
+    """Drive TokenBucket with a fake clock; asyncio.sleep advances it instead of waiting."""
+    state = {"now": 1000.0, "slept": []}
+
+    async def fake_sleep(seconds):
+        state["slept"].append(seconds)
+        state["now"] += seconds
+
+    monkeypatch.setattr(story_to_video.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(story_to_video.asyncio, "sleep", fake_sleep)
+    return state
+
+
+def _acquire(bucket, times=1):
+    async def run():
+        for _ in range(times):
+            await bucket.acquire()
+
+    asyncio.run(run())
+
+
+def test_acquire_paces_requests_to_rate(story_to_video, clock):
+    bucket = story_to_video.TokenBucket(60)
+
+    _acquire(bucket, 3)
+
+    # The first request goes out at once, the rest one second apart at 60/min.
+    assert clock["slept"] == pytest.approx([1.0, 1.0])
+
+
+def test_penalize_halves_rate_once_per_window(story_to_video, clock):
+    bucket = story_to_video.TokenBucket(60)
+    _acquire(bucket)
+
+    for _ in range(8):  # a burst of 429s from requests already in flight
+        bucket.penalize()
+    _acquire(bucket)
+
+    assert clock["slept"] == pytest.approx([2.0])
+
+
+def test_rate_recovers_after_penalty_window(story_to_video, clock):
+    bucket = story_to_video.TokenBucket(60)
+    _acquire(bucket)
+    bucket.penalize()
+
+    clock["now"] += 60.0
+    _acquire(bucket)  # refilled while idle
+    clock["slept"].clear()
+    _acquire(bucket)
+
+    assert clock["slept"] == pytest.approx([1.0])
@@ -0,0 +1,29 @@
+import errno
+import os
+
+import pytest
+
+
+@pytest.mark.skipif(not hasattr(os, "O_DIRECT"), reason="platform has no O_DIRECT")
+def test_write_direct_round_trips_unaligned_data(story_to_video, tmp_path):
+    data = os.urandom(story_to_video.DIRECT_IO_MIN_BYTES + 123)
+    path = tmp_path / "frame.png"
+    try:
+        story_to_video._write_direct(path, data)
+    except OSError as exc:
+        if exc.errno != errno.EINVAL:
+            raise
+        pytest.skip("filesystem rejects O_DIRECT")
+    assert path.read_bytes() == data
+
+
+def test_write_bytes_falls_back_when_direct_io_fails(story_to_video, tmp_path, monkeypatch):
+    def reject(path, data):
+        raise OSError(errno.EINVAL, "O_DIRECT not supported")
+
+    monkeypatch.setattr(story_to_video, "_write_direct", reject)
+    monkeypatch.setattr(story_to_video.os, "O_DIRECT", 0o40000, raising=False)
+    data = b"x" * story_to_video.DIRECT_IO_MIN_BYTES
+    path = tmp_path / "frame.png"
+    story_to_video._write_bytes(path, data)
+    assert path.read_bytes() == data